@@ -0,0 +1,77 @@
+"""
+CORS Middleware for SmartScan AI
+
+Behaves like Starlette's CORSMiddleware configured with allow_origins, allow_methods
+and allow_headers set to "*" and allow_credentials=True, but every header that does
+not depend on the request is encoded once at import instead of per response.
+"""
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+MAX_AGE = b"600"
+
+_SIMPLE_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-credentials", b"true"),
+]
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", ALLOW_METHODS),
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-max-age", MAX_AGE),
+    (b"vary", b"Origin"),
+]
+
+
+class OpenCORSMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        has_cookie = False
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"cookie":
+                has_cookie = True
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            # Every origin, method and header is allowed, so preflight never reaches the app.
+            # With credentials allowed the origin must be echoed rather than "*".
+            headers = [(b"access-control-allow-origin", origin), *_PREFLIGHT_HEADERS]
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if has_cookie:
+            # Credentialed requests are rejected by browsers when the origin is "*"
+            cors_headers = [
+                (b"access-control-allow-origin", origin),
+                (b"access-control-allow-credentials", b"true"),
+                (b"vary", b"Origin"),
+            ]
+        else:
+            cors_headers = _SIMPLE_HEADERS
+
+        async def send_with_cors(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
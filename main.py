@@ -1,28 +1,150 @@
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+import re
+import time
+import itertools
+import logging
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from operator import attrgetter
+from urllib.parse import quote
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Literal, Dict, Any
-import requests
+from typing import List, Optional, Dict, Any
+import httpx
+import orjson
+from cachetools import TTLCache
 
-from database import db, create_document, get_documents
+from cors import OpenCORSMiddleware
+from database import db, create_document, get_documents, prepare_document, insert_documents
 from schemas import (
-    UserProfile, ScanRecord, ScanItem, Verdict, Alternative,
-    HealthScorePoint, GoalType
+    UserProfile, ScanRecord, ScanItem, Nutrients, Verdict, Alternative,
+    HealthScorePoint, GoalType, Goal
 )
 
-app = FastAPI(title="SmartScan AI Backend")
+logger = logging.getLogger(__name__)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app = FastAPI(title="SmartScan AI Backend", default_response_class=ORJSONResponse)
+
+app.add_middleware(OpenCORSMiddleware)
 
 # -------- Helpers (placeholder logic; can be improved with external AI) --------
 OPENFOODFACTS_API = "https://world.openfoodfacts.org/api/v2/product/"
+# Nutrients field -> OpenFoodFacts per-100g nutriment key
+OFF_NUTRIMENT_KEYS = (
+    ("calories", "energy-kcal_100g"),
+    ("protein", "proteins_100g"),
+    ("carbs", "carbohydrates_100g"),
+    ("sugar", "sugars_100g"),
+    ("fat", "fat_100g"),
+    ("sat_fat", "saturated-fat_100g"),
+    ("fiber", "fiber_100g"),
+    ("sodium", "sodium_100g"),
+)
+# Upper bound on the alternatives search so it never dominates a verdict
+ALTERNATIVES_TIMEOUT = 4.0
+
+# OpenFoodFacts etiquette: cap in-flight requests and pace the request rate.
+# These are totals for the whole deployment; the semaphore and limiter live in each
+# worker process, so each worker gets an equal share (WEB_CONCURRENCY workers).
+OFF_MAX_CONCURRENCY = 32
+OFF_RATE_PER_SECOND = 10
+WORKER_COUNT = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+OFF_MAX_ATTEMPTS = 3
+OFF_RETRY_BASE_DELAY = 0.5
+
+# Scan records are written in the background, batched by count or time window
+WRITE_QUEUE_SIZE = 10_000
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_WINDOW = 0.05
+# Longest shutdown waits for the queue to drain (e.g. with MongoDB unreachable)
+WRITE_FLUSH_TIMEOUT = 10.0
+
+# Barcode -> product is effectively immutable; search results drift faster
+PRODUCT_CACHE_TTL = 86400
+ALTERNATIVES_CACHE_TTL = 3600
+
+# Health probes hit /test about once a second; serve the last result for this long
+HEALTH_CACHE_TTL = 5.0
+
+# Seconds an idle pooled connection is kept open for reuse
+HTTP_KEEPALIVE_EXPIRY = 60.0
+
+# Shared async HTTP client for outbound calls; created on startup, closed on shutdown
+http_client: Optional[httpx.AsyncClient] = None
+
+
+@app.on_event("startup")
+async def _size_default_executor():
+    # Backs the remaining blocking work such as DNS lookups; DB calls no longer need a thread
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=min(64, (os.cpu_count() or 1) * 8))
+    )
+
+
+@app.on_event("startup")
+async def _open_http_client():
+    global http_client
+    # HTTP/2 multiplexes concurrent OFF calls over a few warm TLS connections;
+    # idle connections are kept well past httpx's 5s default so bursts skip the handshake
+    http_client = httpx.AsyncClient(
+        http2=True,
+        timeout=6,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+    )
+
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    if http_client is not None:
+        await http_client.aclose()
+
+class AsyncLimiter:
+    """Token bucket allowing `rate` acquisitions per `per` seconds."""
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                # Bucket holds at least one token so rates below 1/per can still acquire
+                self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return self
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+OFF_SEM = asyncio.Semaphore(max(1, OFF_MAX_CONCURRENCY // WORKER_COUNT))
+OFF_LIMITER = AsyncLimiter(rate=OFF_RATE_PER_SECOND / WORKER_COUNT, per=1.0)
+
+
+async def off_get(url: str) -> httpx.Response:
+    # Throttled GET against OpenFoodFacts; 429/5xx are retried with exponential backoff
+    delay = OFF_RETRY_BASE_DELAY
+    for attempt in range(OFF_MAX_ATTEMPTS):
+        async with OFF_SEM, OFF_LIMITER:
+            r = await http_client.get(url)
+        if r.status_code != 429 and r.status_code < 500:
+            return r
+        if attempt < OFF_MAX_ATTEMPTS - 1:
+            await asyncio.sleep(delay)
+            delay *= 2
+    r.raise_for_status()
+    return r
+
 
 class VerdictRequest(BaseModel):
     user_id: str
@@ -30,67 +152,170 @@ class VerdictRequest(BaseModel):
     item: ScanItem
 
 
-def compute_verdict(goal: GoalType, item: ScanItem) -> Verdict:
+# Per-goal scoring rules: (nutrient, bisect, thresholds, score delta per bucket, insulin risk per bucket).
+# bisect_left makes a threshold inclusive on the lower bucket (<=), bisect_right on the upper (>=).
+_SUGAR_RULE = ("sugar", bisect_left, (5, 10), (20, 0, -25), ("low", "medium", "high"))
+GOAL_RULES: Dict[Goal, List[tuple]] = {
+    Goal.BALANCED: [],
+    Goal.WEIGHT_LOSS: [("calories", bisect_left, (150, 350), (10, 0, -15), None)],
+    Goal.MUSCLE_GAIN: [("protein", bisect_right, (10, 20), (-10, 5, 15), None)],
+    Goal.HEART_HEALTH: [_SUGAR_RULE],
+    Goal.LOW_SUGAR: [_SUGAR_RULE],
+}
+# Bucket a NaN nutrient falls into (NaN is valid JSON/Pydantic float input). Every comparison
+# with NaN is false, so the original if-chains sent sugar to its final else (> 10), protein to
+# its final else (< 10) and calories past both branches (150 < c <= 350).
+NAN_BUCKETS = {"sugar": 2, "protein": 0, "calories": 1}
+# API goal strings -> Goal; handlers convert once at the boundary
+_GOAL_FROM_STR: Dict[str, Goal] = {g.name.lower(): g for g in Goal}
+BASE_SCORE = 70
+INSULIN_RISKS = ("low", "medium", "high")
+
+VERDICT_COLORS = ("green", "yellow", "red")
+# Micro explanation 8-12 words, one per color
+EXPLANATIONS = (
+    "Balanced nutrients; aligns well with your selected goal.",
+    "Mixed profile; moderation advised based on your goal.",
+    "High risk factors for your goal; consider safer option.",
+)
+
+
+def _bucket_dims():
+    # One dimension per nutrient any rule reads: (name, bisect, thresholds, bit shift, missing bucket, NaN bucket).
+    # The lookup table needs every goal to bucket a given nutrient the same way.
+    dims: Dict[str, tuple] = {}
+    for rules in GOAL_RULES.values():
+        for name, bisect, th, _, _ in rules:
+            if dims.setdefault(name, (bisect, th)) != (bisect, th):
+                raise ValueError(f"GOAL_RULES use conflicting thresholds for {name!r}")
+    out, shift = [], 0
+    for name, (bisect, th) in dims.items():
+        missing = len(th) + 1
+        out.append((name, bisect, th, shift, missing, NAN_BUCKETS[name]))
+        shift += missing.bit_length()
+    return out, shift
+
+
+# Every (goal, per-nutrient bucket) combination is scored once at import; a verdict is then
+# a few bisects to build the packed key plus one list lookup.
+_BUCKET_DIMS, _GOAL_SHIFT = _bucket_dims()
+
+
+def _build_verdict_table() -> list:
+    table = [None] * (len(Goal) << _GOAL_SHIFT)
+    for goal, rules in GOAL_RULES.items():
+        for buckets in itertools.product(*(range(dim[4] + 1) for dim in _BUCKET_DIMS)):
+            key = goal << _GOAL_SHIFT
+            bucket_of: Dict[str, Optional[int]] = {}
+            for (name, _, _, shift, missing, _), bucket in zip(_BUCKET_DIMS, buckets):
+                key |= bucket << shift
+                bucket_of[name] = None if bucket == missing else bucket
+            # Apply the goal's rules as if each nutrient had bisected into its bucket
+            score = BASE_SCORE
+            risk = 1
+            for name, _, _, d, rule_risk in rules:
+                bucket = bucket_of[name]
+                if bucket is None:
+                    continue
+                score += d[bucket]
+                if rule_risk is not None:
+                    risk = INSULIN_RISKS.index(rule_risk[bucket])
+            score = max(0, min(100, score))
+            color_id = 0 if score >= 75 else (1 if score >= 55 else 2)
+            entry = Verdict(
+                color=VERDICT_COLORS[color_id], score=score,
+                explanation=EXPLANATIONS[color_id], insulin_risk=INSULIN_RISKS[risk],
+            )
+            table[key] = (entry.score, entry.color, entry.explanation, entry.insulin_risk)
+    return table
+
+
+_VERDICT_TABLE = _build_verdict_table()
+_BUCKET_READERS = [(attrgetter(name), *rest) for name, *rest in _BUCKET_DIMS]
+
+
+def compute_verdict(goal: Goal, item: ScanItem) -> Verdict:
     # Simple heuristic: prioritize sugar for low_sugar/heart, protein for muscle, calories for weight
-    score = 70
-    insulin_risk: Literal["low", "medium", "high"] = "medium"
-
-    if item.nutrients and item.nutrients.sugar is not None:
-        sugar = item.nutrients.sugar
-        if goal in ("low_sugar", "heart_health"):
-            if sugar <= 5:
-                score += 20; insulin_risk = "low"
-            elif sugar <= 10:
-                score += 0; insulin_risk = "medium"
-            else:
-                score -= 25; insulin_risk = "high"
-    if item.nutrients and item.nutrients.protein is not None and goal == "muscle_gain":
-        protein = item.nutrients.protein
-        if protein >= 20:
-            score += 15
-        elif protein >= 10:
-            score += 5
+    key = goal << _GOAL_SHIFT
+    n = item.nutrients
+    for get, bisect, th, shift, missing, nan_bucket in _BUCKET_READERS:
+        val = get(n) if n is not None else None
+        if val is None:
+            bucket = missing
+        elif val != val:
+            bucket = nan_bucket
         else:
-            score -= 10
-    if item.nutrients and item.nutrients.calories is not None and goal == "weight_loss":
-        c = item.nutrients.calories
-        if c <= 150:
-            score += 10
-        elif c > 350:
-            score -= 15
+            bucket = bisect(th, val)
+        key |= bucket << shift
+    score, color, explanation, insulin_risk = _VERDICT_TABLE[key]
+    # Table entries were validated when the table was built
+    return Verdict.model_construct(color=color, score=score, explanation=explanation, insulin_risk=insulin_risk)
 
-    score = max(0, min(100, score))
-    color: Literal["green", "yellow", "red"] = "green" if score >= 75 else ("yellow" if score >= 55 else "red")
 
-    # Micro explanation 8-12 words
-    if color == "green":
-        explanation = "Balanced nutrients; aligns well with your selected goal."
-    elif color == "yellow":
-        explanation = "Mixed profile; moderation advised based on your goal."
-    else:
-        explanation = "High risk factors for your goal; consider safer option."
-
-    return Verdict(color=color, score=score, explanation=explanation, insulin_risk=insulin_risk)
+@lru_cache(maxsize=1024)
+def _allergen_matcher(allergies: tuple):
+    # One compiled alternation per distinct allergy list, plus, per alternative, every
+    # user spelling a match on it implies
+    spellings: Dict[str, List[str]] = {}
+    for a in allergies:
+        if a:
+            spellings.setdefault(a.lower(), []).append(a)
+    if not spellings:
+        return None
+    # Zero-width lookahead reports a match at every position, longest allergen first;
+    # shorter allergens starting at the same position are prefixes of it, so expand those.
+    # Each alternative is its own group so m.lastindex identifies it without touching the text.
+    ordered = sorted(spellings, key=len, reverse=True)
+    pattern = re.compile("(?=(?:" + "|".join(f"({re.escape(k)})" for k in ordered) + "))", re.IGNORECASE)
+    # Indexed by group number; group 0 never identifies an alternative
+    implied = [()] + [
+        [orig for other in ordered if key.startswith(other) for orig in spellings[other]]
+        for key in ordered
+    ]
+    return pattern, implied
 
 
 def detect_allergens(ingredients_text: Optional[str], user_allergies: List[str]) -> List[str]:
-    found = []
-    if not ingredients_text:
-        return found
-    txt = ingredients_text.lower()
-    for a in user_allergies:
-        if a.lower() in txt:
-            found.append(a)
-    return found
+    # Each matching allergen is reported once, in the order it first appears in the text.
+    # re.IGNORECASE folding is not str.lower(): e.g. "İstanbul" does not match "i̇stanbul".
+    if not ingredients_text or not user_allergies:
+        return []
+    matcher = _allergen_matcher(tuple(sorted(user_allergies)))
+    if matcher is None:
+        return []
+    pattern, implied = matcher
+    found: Dict[str, None] = {}
+    for m in pattern.finditer(ingredients_text):
+        for orig in implied[m.lastindex]:
+            found[orig] = None
+    return list(found)
+
+
+async def find_alternatives(item: ScanItem, goal: GoalType) -> List[Alternative]:
+    try:
+        return await asyncio.wait_for(_search_alternatives(item, goal), ALTERNATIVES_TIMEOUT)
+    except asyncio.TimeoutError:
+        return []
+
+
+_alternatives_cache: TTLCache = TTLCache(maxsize=10_000, ttl=ALTERNATIVES_CACHE_TTL)
+_alternatives_lock = asyncio.Lock()
 
 
-def find_alternatives(item: ScanItem, goal: GoalType) -> List[Alternative]:
+async def _search_alternatives(item: ScanItem, goal: GoalType) -> List[Alternative]:
     # Grounded search via OpenFoodFacts categories/brands as a lightweight approach
+    query = item.brand or item.name or "healthy"
+    key = (query, goal)
+    async with _alternatives_lock:
+        cached = _alternatives_cache.get(key)
+    if cached is not None:
+        return cached
+
     results: List[Alternative] = []
     try:
-        query = item.brand or item.name or "healthy"
-        url = f"https://world.openfoodfacts.org/cgi/search.pl?action=process&search_terms={requests.utils.quote(query)}&json=1&page_size=5&tagtype_0=labels&tag_contains_0=contains&tag_0=organic"
-        data = requests.get(url, timeout=6).json()
+        url = f"https://world.openfoodfacts.org/cgi/search.pl?action=process&search_terms={quote(query)}&json=1&page_size=5&tagtype_0=labels&tag_contains_0=contains&tag_0=organic"
+        r = await off_get(url)
+        data = orjson.loads(r.content)
         for p in data.get("products", [])[:5]:
             results.append(Alternative(
                 name=p.get("product_name") or "Alternative",
@@ -99,17 +324,146 @@ def find_alternatives(item: ScanItem, goal: GoalType) -> List[Alternative]:
                 barcode=p.get("code"),
             ))
     except Exception:
-        pass
+        return results
+    async with _alternatives_lock:
+        _alternatives_cache[key] = results
     return results
 
 
+_product_cache: TTLCache = TTLCache(maxsize=10_000, ttl=PRODUCT_CACHE_TTL)
+_product_lock = asyncio.Lock()
+# Cache misses currently being fetched, so concurrent scans of one barcode share a request
+_product_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def fetch_product(code: str) -> Optional[ScanItem]:
+    """Look up a barcode on OpenFoodFacts; returns None when the product is unknown."""
+    async with _product_lock:
+        cached = _product_cache.get(code)
+    if cached is not None:
+        return cached
+
+    fut = _product_inflight.get(code)
+    if fut is None:
+        fut = asyncio.ensure_future(_fetch_product_uncached(code))
+        _product_inflight[code] = fut
+        fut.add_done_callback(lambda _: _product_inflight.pop(code, None))
+    # Shielded so one cancelled caller does not cancel the fetch for everyone else
+    return await asyncio.shield(fut)
+
+
+async def _fetch_product_uncached(code: str) -> Optional[ScanItem]:
+    r = await off_get(f"{OPENFOODFACTS_API}{code}.json")
+    data = orjson.loads(r.content)
+    if data.get("status") != 1:
+        return None
+    p = data.get("product", {})
+    nutriments = p.get("nutriments") or {}
+    nova_group = p.get("nova_group")
+    # OFF payloads are parsed straight into models without re-validating each field
+    item = ScanItem.model_construct(
+        name=p.get("product_name"),
+        brand=p.get("brands"),
+        barcode=p.get("code"),
+        image_url=p.get("image_front_small_url") or p.get("image_url"),
+        ingredients_text=p.get("ingredients_text"),
+        nutrients=Nutrients.model_construct(**{field: nutriments.get(key) for field, key in OFF_NUTRIMENT_KEYS}),
+        processing_level=str(nova_group) if nova_group is not None else None,
+    )
+    async with _product_lock:
+        _product_cache[code] = item
+    return item
+
+
+_write_queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+_writer_task: Optional[asyncio.Task] = None
+# Documents queued but not yet through a write attempt (includes the batch being inserted)
+_pending_writes = 0
+
+
+async def enqueue_document(collection_name: str, data) -> str:
+    """Queue a document for a batched insert and return its pre-assigned id."""
+    global _pending_writes
+    doc = prepare_document(data)
+    try:
+        _write_queue.put_nowait((collection_name, doc))
+        _pending_writes += 1
+    except asyncio.QueueFull:
+        # Writer is behind; insert inline rather than drop the record
+        await insert_documents(collection_name, [doc])
+    return str(doc["_id"])
+
+
+async def _writer_loop():
+    global _pending_writes
+    loop = asyncio.get_running_loop()
+    while True:
+        collection_name, doc = await _write_queue.get()
+        batches: Dict[str, list] = {collection_name: [doc]}
+        count = 1
+        deadline = loop.time() + WRITE_BATCH_WINDOW
+        while count < WRITE_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                collection_name, doc = await asyncio.wait_for(_write_queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batches.setdefault(collection_name, []).append(doc)
+            count += 1
+        for collection_name, docs in batches.items():
+            try:
+                await insert_documents(collection_name, docs)
+            except Exception:
+                logger.exception("Failed to write %d documents to %s", len(docs), collection_name)
+        _pending_writes -= count
+        for _ in range(count):
+            _write_queue.task_done()
+
+
+@app.on_event("startup")
+async def _start_writer():
+    global _writer_task
+    _writer_task = asyncio.create_task(_writer_loop())
+
+
+@app.on_event("shutdown")
+async def _stop_writer():
+    # Flush whatever is still queued before the process exits, but never block shutdown indefinitely
+    if _writer_task is not None and not _writer_task.done():
+        try:
+            await asyncio.wait_for(_write_queue.join(), WRITE_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        _writer_task.cancel()
+    if _pending_writes:
+        logger.error("Dropping %d queued documents that were not written before shutdown", _pending_writes)
+
+
+async def save_scan_with_alternatives(record: ScanRecord):
+    record.alternatives = await find_alternatives(record.item, record.goal)
+    scan_id = await enqueue_document("scanrecord", record)
+    return scan_id, record.alternatives
+
+
 # ------------------------------- API Routes -----------------------------------
 @app.get("/")
-def root():
+async def root():
     return {"message": "SmartScan AI Backend Running"}
 
+# (monotonic timestamp, encoded body) of the last /test probe
+# monotonic() counts from boot, so start at -inf; 0.0 would look fresh on a just-booted host
+_last_health: tuple = (float("-inf"), b"")
+
+
 @app.get("/test")
-def test_database():
+async def test_database():
+    global _last_health
+    checked_at, body = _last_health
+    if time.monotonic() - checked_at < HEALTH_CACHE_TTL:
+        return Response(content=body, media_type="application/json")
+
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -124,51 +478,30 @@ def test_database():
             response["database_url"] = "✅ Set"
             response["database_name"] = getattr(db, 'name', '✅ Connected')
             response["connection_status"] = "Connected"
-            collections = db.list_collection_names()
+            collections = await db.list_collection_names()
             response["collections"] = collections[:10]
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:80]}"
-    return response
+    body = orjson.dumps(response)
+    _last_health = (time.monotonic(), body)
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/barcode/{code}")
-def barcode_lookup(code: str):
+async def barcode_lookup(code: str):
     try:
-        r = requests.get(f"{OPENFOODFACTS_API}{code}.json", timeout=6)
-        data = r.json()
-        if data.get("status") != 1:
-            raise HTTPException(status_code=404, detail="Product not found")
-        p = data.get("product", {})
-        item = ScanItem(
-            name=p.get("product_name"),
-            brand=p.get("brands"),
-            barcode=p.get("code"),
-            image_url=p.get("image_front_small_url") or p.get("image_url"),
-            ingredients_text=p.get("ingredients_text"),
-            nutrients={
-                "calories": p.get("nutriments", {}).get("energy-kcal_100g"),
-                "protein": p.get("nutriments", {}).get("proteins_100g"),
-                "carbs": p.get("nutriments", {}).get("carbohydrates_100g"),
-                "sugar": p.get("nutriments", {}).get("sugars_100g"),
-                "fat": p.get("nutriments", {}).get("fat_100g"),
-                "sat_fat": p.get("nutriments", {}).get("saturated-fat_100g"),
-                "fiber": p.get("nutriments", {}).get("fiber_100g"),
-                "sodium": p.get("nutriments", {}).get("sodium_100g"),
-            },
-            processing_level=p.get("nova_group"),
-        )
-        return item
-    except HTTPException:
-        raise
+        item = await fetch_product(code)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if item is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return item
 
 
 @app.post("/api/verdict")
-def generate_verdict(req: VerdictRequest):
-    verdict = compute_verdict(req.goal, req.item)
+async def generate_verdict(req: VerdictRequest):
+    verdict = compute_verdict(_GOAL_FROM_STR[req.goal], req.item)
     allergens = detect_allergens(req.item.ingredients_text, [])
-    alternatives = find_alternatives(req.item, req.goal)
 
     record = ScanRecord(
         user_id=req.user_id,
@@ -176,9 +509,8 @@ def generate_verdict(req: VerdictRequest):
         item=req.item,
         verdict=verdict,
         allergens_found=allergens,
-        alternatives=alternatives,
     )
-    scan_id = create_document("scanrecord", record)
+    scan_id, alternatives = await save_scan_with_alternatives(record)
     return {"scan_id": scan_id, "verdict": verdict, "allergens": allergens, "alternatives": alternatives}
 
 
@@ -186,14 +518,14 @@ class ProfileRequest(BaseModel):
     user_id: str
 
 @app.post("/api/profile")
-def get_or_create_profile(req: ProfileRequest):
-    docs = get_documents("userprofile", {"user_id": req.user_id}, limit=1)
+async def get_or_create_profile(req: ProfileRequest):
+    docs = await get_documents("userprofile", {"user_id": req.user_id}, limit=1)
     if docs:
         doc = docs[0]
         doc["_id"] = str(doc["_id"])  # serialize
         return doc
     profile = UserProfile(user_id=req.user_id)
-    _id = create_document("userprofile", profile)
+    _id = await create_document("userprofile", profile)
     return {"_id": _id, **profile.model_dump()}
 
 
@@ -202,15 +534,25 @@ def get_or_create_profile(req: ProfileRequest):
 async def scan_image(user_id: str, goal: GoalType, file: UploadFile = File(...)):
     # In a full build, send to a vision model. Here we return a stub item.
     item = ScanItem(name="Detected Meal", brand=None, image_url=None, ingredients_text="rice, chicken, spices", nutrients={"calories": 250, "protein": 18, "carbs": 30, "sugar": 2})
-    verdict = compute_verdict(goal, item)
+    verdict = compute_verdict(_GOAL_FROM_STR[goal], item)
     allergens = detect_allergens(item.ingredients_text, [])
-    alternatives = find_alternatives(item, goal)
-    record = ScanRecord(user_id=user_id, goal=goal, item=item, verdict=verdict, allergens_found=allergens, alternatives=alternatives)
-    scan_id = create_document("scanrecord", record)
+    record = ScanRecord(user_id=user_id, goal=goal, item=item, verdict=verdict, allergens_found=allergens)
+    scan_id, alternatives = await save_scan_with_alternatives(record)
     return {"scan_id": scan_id, "item": item, "verdict": verdict, "allergens": allergens, "alternatives": alternatives}
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Each worker is its own process: caches, in-flight maps, the write queue and the OFF
+    # semaphore/limiter are per worker. Export the count so workers split the OFF budget.
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+    )
@@ -3,10 +3,20 @@ Database Schemas for SmartScan AI
 
 Each Pydantic model becomes a MongoDB collection (lowercased class name).
 """
+from enum import IntEnum
 from typing import List, Optional, Literal, Dict, Any
 from pydantic import BaseModel, Field
 
 GoalType = Literal["balanced", "weight_loss", "muscle_gain", "heart_health", "low_sugar"]
+
+class Goal(IntEnum):
+    """Integer form of GoalType used internally; the API keeps the string literals"""
+    BALANCED = 0
+    WEIGHT_LOSS = 1
+    MUSCLE_GAIN = 2
+    HEART_HEALTH = 3
+    LOW_SUGAR = 4
+
 LanguageCode = Literal["en", "hi", "mr", "hinglish"]
 
 class UserProfile(BaseModel):
@@ -0,0 +1,73 @@
+"""
+OpenCORSMiddleware must answer like Starlette's CORSMiddleware configured the way main.py
+used to configure it (every origin, method and header allowed, credentials allowed).
+"""
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from cors import OpenCORSMiddleware
+
+CORS_HEADERS = (
+    "access-control-allow-origin",
+    "access-control-allow-credentials",
+    "access-control-allow-methods",
+    "access-control-allow-headers",
+    "access-control-max-age",
+    "vary",
+)
+
+
+def _app() -> Starlette:
+    async def hello(request):
+        return PlainTextResponse("hello")
+
+    return Starlette(routes=[Route("/", hello, methods=["GET", "POST"])])
+
+
+reference = CORSMiddleware(
+    _app(), allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
+)
+candidate = OpenCORSMiddleware(_app())
+
+
+def _cors(response) -> dict:
+    return {name: response.headers.get(name) for name in CORS_HEADERS}
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"Origin": "https://example.com"},
+    {"Origin": "https://example.com", "Cookie": "session=1"},
+])
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_simple_requests_match_starlette(method, headers):
+    expected = TestClient(reference).request(method, "/", headers=headers)
+    actual = TestClient(candidate).request(method, "/", headers=headers)
+    assert actual.status_code == expected.status_code
+    assert actual.text == expected.text
+    assert _cors(actual) == _cors(expected)
+
+
+@pytest.mark.parametrize("request_headers", [None, "content-type", "content-type, x-custom"])
+def test_preflight_matches_starlette(request_headers):
+    headers = {"Origin": "https://example.com", "Access-Control-Request-Method": "POST"}
+    if request_headers is not None:
+        headers["Access-Control-Request-Headers"] = request_headers
+    expected = TestClient(reference).options("/", headers=headers)
+    actual = TestClient(candidate).options("/", headers=headers)
+    # Starlette answers 200 "OK"; the precomputed preflight is an empty 204
+    assert expected.status_code == 200
+    assert actual.status_code == 204
+    assert _cors(actual) == _cors(expected)
+
+
+def test_options_without_preflight_headers_reaches_app():
+    headers = {"Origin": "https://example.com"}
+    expected = TestClient(reference).options("/", headers=headers)
+    actual = TestClient(candidate).options("/", headers=headers)
+    assert actual.status_code == expected.status_code
+    assert _cors(actual) == _cors(expected)
@@ -0,0 +1,81 @@
+"""
+The precomputed verdict table must give the same verdict as the original branchy
+compute_verdict for every goal, including missing, NaN and infinite nutrients.
+"""
+import itertools
+import math
+
+import pytest
+
+from main import compute_verdict, _GOAL_FROM_STR
+from schemas import ScanItem, Verdict
+
+
+def baseline_compute_verdict(goal: str, item: ScanItem) -> Verdict:
+    # Verbatim logic of compute_verdict before the rules-table rewrite
+    score = 70
+    insulin_risk = "medium"
+
+    if item.nutrients and item.nutrients.sugar is not None:
+        sugar = item.nutrients.sugar
+        if goal in ("low_sugar", "heart_health"):
+            if sugar <= 5:
+                score += 20; insulin_risk = "low"
+            elif sugar <= 10:
+                score += 0; insulin_risk = "medium"
+            else:
+                score -= 25; insulin_risk = "high"
+    if item.nutrients and item.nutrients.protein is not None and goal == "muscle_gain":
+        protein = item.nutrients.protein
+        if protein >= 20:
+            score += 15
+        elif protein >= 10:
+            score += 5
+        else:
+            score -= 10
+    if item.nutrients and item.nutrients.calories is not None and goal == "weight_loss":
+        c = item.nutrients.calories
+        if c <= 150:
+            score += 10
+        elif c > 350:
+            score -= 15
+
+    score = max(0, min(100, score))
+    color = "green" if score >= 75 else ("yellow" if score >= 55 else "red")
+
+    if color == "green":
+        explanation = "Balanced nutrients; aligns well with your selected goal."
+    elif color == "yellow":
+        explanation = "Mixed profile; moderation advised based on your goal."
+    else:
+        explanation = "High risk factors for your goal; consider safer option."
+
+    return Verdict(color=color, score=score, explanation=explanation, insulin_risk=insulin_risk)
+
+
+GOALS = list(_GOAL_FROM_STR)
+# Every threshold, its neighbours, and the non-finite / missing cases
+VALUES = [
+    None, math.nan, math.inf, -math.inf, -1, 0,
+    4.9, 5, 5.1, 9.9, 10, 10.1, 19.9, 20, 20.1,
+    149.9, 150, 150.1, 349.9, 350, 350.1,
+]
+
+
+def _key(v: Verdict):
+    return (v.score, v.color, v.explanation, v.insulin_risk)
+
+
+@pytest.mark.parametrize("goal", GOALS)
+def test_table_matches_baseline(goal):
+    for sugar, protein, calories in itertools.product(VALUES, VALUES, VALUES):
+        item = ScanItem(nutrients={"sugar": sugar, "protein": protein, "calories": calories})
+        expected = baseline_compute_verdict(goal, item)
+        actual = compute_verdict(_GOAL_FROM_STR[goal], item)
+        assert _key(actual) == _key(expected), (goal, sugar, protein, calories)
+
+
+@pytest.mark.parametrize("goal", GOALS)
+def test_no_nutrients_matches_baseline(goal):
+    item = ScanItem(nutrients=None)
+    assert _key(compute_verdict(_GOAL_FROM_STR[goal], item)) == _key(baseline_compute_verdict(goal, item))